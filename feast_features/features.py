@@ -1,5 +1,6 @@
 from feast import Entity, FeatureView, FileSource, Field
-from feast.types import Float64, Int64, ValueType
+from feast.data_format import ParquetFormat
+from feast.types import Float32, Int32, ValueType
 from datetime import timedelta
 
 # Define entity
@@ -8,31 +9,36 @@ stock_entity = Entity(name="stock", value_type=ValueType.STRING)
 # Define feature sources
 stock_source_v0 = FileSource(
     name="stock_source_v0",
-    path="../data/processed/processed_v0.csv",
+    path="../data/processed/processed_v0.parquet",
+    file_format=ParquetFormat(),
     timestamp_field="timestamp",
 )
 
 stock_source_v1 = FileSource(
     name="stock_source_v1", 
-    path="../data/processed/processed_v1.csv",
+    path="../data/processed/processed_v1.parquet",
+    file_format=ParquetFormat(),
     timestamp_field="timestamp",
 )
 
+# Define feature schema (shared by all versions)
+stock_schema = [
+    Field(name="rolling_avg_10", dtype=Float32),
+    Field(name="volume_sum_10", dtype=Float32),
+    Field(name="target", dtype=Int32),
+    Field(name="open", dtype=Float32),
+    Field(name="high", dtype=Float32),
+    Field(name="low", dtype=Float32),
+    Field(name="close", dtype=Float32),
+    Field(name="volume", dtype=Float32),
+]
+
 # Define feature views
 stock_features_v0 = FeatureView(
     name="stock_features_v0",
     entities=[stock_entity],
     ttl=timedelta(days=1),
-    schema=[
-        Field(name="rolling_avg_10", dtype=Float64),
-        Field(name="volume_sum_10", dtype=Float64),
-        Field(name="target", dtype=Int64),
-        Field(name="open", dtype=Float64),
-        Field(name="high", dtype=Float64),
-        Field(name="low", dtype=Float64),
-        Field(name="close", dtype=Float64),
-        Field(name="volume", dtype=Float64),
-    ],
+    schema=stock_schema,
     online=True,
     source=stock_source_v0,
 )
@@ -41,16 +47,7 @@ stock_features_v1 = FeatureView(
     name="stock_features_v1",
     entities=[stock_entity],
     ttl=timedelta(days=1),
-    schema=[
-        Field(name="rolling_avg_10", dtype=Float64),
-        Field(name="volume_sum_10", dtype=Float64),
-        Field(name="target", dtype=Int64),
-        Field(name="open", dtype=Float64),
-        Field(name="high", dtype=Float64),
-        Field(name="low", dtype=Float64),
-        Field(name="close", dtype=Float64),
-        Field(name="volume", dtype=Float64),
-    ],
+    schema=stock_schema,
     online=True,
     source=stock_source_v1,
 )
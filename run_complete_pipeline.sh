@@ -20,7 +20,7 @@ echo "🔄 Processing v0 data (AARTIIND + ABCAPITAL)..."
 python3 src/data_preprocessing.py 0
 
 # Check if v0 data was created
-if [ -f "data/processed/processed_v0.csv" ]; then
+if [ -f "data/processed/processed_v0.parquet" ]; then
     echo "✅ v0 data preprocessing completed"
     
     # Train v0 model
@@ -37,7 +37,7 @@ echo "🔄 Processing v1 data (All 5 stocks)..."
 python3 src/data_preprocessing.py 1
 
 # Check if v1 data was created
-if [ -f "data/processed/processed_v1.csv" ]; then
+if [ -f "data/processed/processed_v1.parquet" ]; then
     echo "✅ v1 data preprocessing completed"
     
     # Train v1 model
@@ -1,87 +1,154 @@
 import pandas as pd
 import numpy as np
+from joblib import Parallel, delayed
 from pathlib import Path
 import sys
 import os
 
+MARKET_TZ = 'Asia/Kolkata'
+
 def load_and_preprocess_data(file_path):
     """Load CSV and handle missing minutes"""
     print(f"Loading data from {file_path}")
-    df = pd.read_csv(file_path)
-    
-    # Convert timestamp and sort by time (CRITICAL: don't assume sorted)
-    df['timestamp'] = pd.to_datetime(df['timestamp'])
-    df = df.sort_values('timestamp').reset_index(drop=True)
+    df = pd.read_csv(file_path, engine='pyarrow')
     
-    # Create complete minute range for trading hours
-    start_time = df['timestamp'].min()
-    end_time = df['timestamp'].max()
+    # pyarrow infers ISO timestamps itself; fall back to pandas for other formats
+    if not pd.api.types.is_datetime64_any_dtype(df['timestamp']):
+        df['timestamp'] = pd.to_datetime(df['timestamp'])
     
-    # Generate all trading minutes (9:15 AM to 3:30 PM, Mon-Fri)
-    all_minutes = pd.date_range(start=start_time, end=end_time, freq='1T')
-    trading_minutes = []
+    # pyarrow normalizes offset timestamps to UTC; trading hours are in exchange time
+    if df['timestamp'].dt.tz is not None:
+        df['timestamp'] = df['timestamp'].dt.tz_convert(MARKET_TZ)
     
-    for minute in all_minutes:
-        # Only include trading hours
-        if minute.weekday() < 5:  # Monday to Friday
-            hour = minute.hour
-            min_val = minute.minute
-            if (hour == 9 and min_val >= 15) or (9 < hour < 15) or (hour == 15 and min_val <= 30):
-                trading_minutes.append(minute)
+    # Sort by time (CRITICAL: don't assume sorted)
+    df = df.sort_values('timestamp').reset_index(drop=True)
     
-    # Reindex to include all trading minutes
-    df = df.set_index('timestamp')
-    full_index = pd.DatetimeIndex(trading_minutes)
-    df = df.reindex(full_index)
+    # Expand to a complete 1-minute grid, then keep only trading minutes
+    # (9:15 AM to 3:30 PM, Mon-Fri)
+    df = df.set_index('timestamp').asfreq('1T')
+    minute_of_day = df.index.hour * 60 + df.index.minute
+    is_trading = (df.index.weekday < 5) & (minute_of_day >= 9 * 60 + 15) & (minute_of_day <= 15 * 60 + 30)
+    df = df[is_trading]
     
     # Forward fill missing values (augment with previous minute's data)
-    df = df.fillna(method='ffill')
+    df = df.ffill()
     
     # Reset index
     df = df.reset_index()
-    df.rename(columns={'index': 'timestamp'}, inplace=True)
     
     return df
 
+def rolling_sum_count(values, window):
+    """Trailing window sum and count of non-NaN values in O(N)"""
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values)
+    sums = np.cumsum(np.where(valid, values, 0.0))
+    counts = np.cumsum(valid)
+    sums[window:] = sums[window:] - sums[:-window]
+    counts[window:] = counts[window:] - counts[:-window]
+    return sums, counts
+
 def create_features(df):
     """Create rolling average and volume sum features"""
-    # Ensure data is sorted by timestamp
-    df = df.sort_values('timestamp').reset_index(drop=True)
+    # Ensure data is sorted by timestamp (skip the sort when the caller already did it)
+    if df['timestamp'].is_monotonic_increasing:
+        # Shallow copy so new/recast columns don't leak into the caller's frame,
+        # with the same fresh RangeIndex the sorted branch gets from reset_index
+        df = df.copy(deep=False)
+        df.index = pd.RangeIndex(len(df))
+    else:
+        df = df.sort_values('timestamp').reset_index(drop=True)
     
     # 10-minute rolling average of close price (t-9 to t)
-    df['rolling_avg_10'] = df['close'].rolling(window=10, min_periods=1).mean()
+    close_sum, close_count = rolling_sum_count(df['close'].to_numpy(), 10)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        df['rolling_avg_10'] = np.where(close_count > 0, close_sum / close_count, np.nan)
     
     # 10-minute volume sum (t-10 to t) - Note: includes current minute
-    df['volume_sum_10'] = df['volume'].rolling(window=10, min_periods=1).sum()
+    volume_sum, volume_count = rolling_sum_count(df['volume'].to_numpy(), 10)
+    df['volume_sum_10'] = np.where(volume_count > 0, volume_sum, np.nan)
     
     # Target: 1 if price is higher 5 minutes later, 0 otherwise
-    df['target'] = (df['close'].shift(-5) > df['close']).astype(int)
+    close = df['close'].to_numpy()
+    target = np.zeros(len(close), dtype=bool)
+    np.greater(close[5:], close[:-5], out=target[:-5])
+    df['target'] = target.view(np.int8)
     
-    # Remove rows where target cannot be computed (last 5 rows)
-    df = df[:-5].copy()
+    # Minute bars don't need float64 precision; halve memory for training and storage
+    for col in ['open', 'high', 'low', 'close', 'volume', 'rolling_avg_10', 'volume_sum_10']:
+        df[col] = df[col].astype(np.float32)
     
+    # Remove rows where target cannot be computed (last 5 rows)
+    return df.iloc[:-5]
+
+def process_stock(path, stock_dtype):
+    """Load one stock file and create its features"""
+    stock_name = Path(path).stem.split('__')[0]
+    print(f"Processing {stock_name}")
+    df = load_and_preprocess_data(path)
+    # Label before create_features, which returns a view of the trimmed frame
+    stock_code = stock_dtype.categories.get_loc(stock_name)
+    df['stock'] = pd.Categorical.from_codes(np.full(len(df), stock_code), dtype=stock_dtype)
+    df = create_features(df)
+    print(f"  - Records: {len(df)}")
     return df
 
+def column_values(series):
+    """Plain NumPy values backing a column (category codes, UTC datetimes)"""
+    if isinstance(series.dtype, pd.CategoricalDtype):
+        return series.array.codes
+    return series.values
+
+def column_from_values(values, dtype):
+    """Rebuild a column of the given dtype from column_values() output"""
+    if isinstance(dtype, pd.CategoricalDtype):
+        return pd.Categorical.from_codes(values, dtype=dtype)
+    if isinstance(dtype, pd.DatetimeTZDtype):
+        return pd.arrays.DatetimeArray(values, dtype=dtype)
+    return values
+
+def stack_frames_consuming(frames):
+    """Stack same-schema frames into preallocated columns; empties the frames list as it copies"""
+    columns = list(frames[0].columns)
+    dtypes = frames[0].dtypes
+    for df in frames[1:]:
+        if list(df.columns) != columns or not df.dtypes.equals(dtypes):
+            raise ValueError(f"Cannot stack frames with different schemas: {dict(dtypes)} vs {dict(df.dtypes)}")
+    total = sum(len(df) for df in frames)
+    out = {col: np.empty(total, dtype=column_values(frames[0][col]).dtype) for col in columns}
+    
+    offset = 0
+    while frames:
+        # Pop each frame so it can be freed as soon as it has been copied
+        df = frames.pop(0)
+        for col in columns:
+            out[col][offset:offset + len(df)] = column_values(df[col])
+        offset += len(df)
+    
+    return pd.DataFrame({col: column_from_values(out[col], dtypes[col]) for col in columns}, copy=False)
+
 def combine_stock_data(data_paths, version):
     """Combine multiple stock data files"""
-    combined_data = []
-    
+    existing_paths = []
     for path in data_paths:
         if os.path.exists(path):
-            stock_name = Path(path).stem.split('__')[0]
-            print(f"Processing {stock_name}")
-            df = load_and_preprocess_data(path)
-            df = create_features(df)
-            df['stock'] = stock_name
-            combined_data.append(df)
-            print(f"  - Records: {len(df)}")
+            existing_paths.append(path)
         else:
             print(f"Warning: {path} not found")
     
+    # Shared category dtype so every stock's codes index the same categories
+    stock_dtype = pd.CategoricalDtype(list(dict.fromkeys(Path(path).stem.split('__')[0] for path in existing_paths)))
+    
+    # Stock files are independent, so process them in parallel worker processes
+    combined_data = Parallel(n_jobs=-1, backend='loky')(
+        delayed(process_stock)(path, stock_dtype) for path in existing_paths
+    )
+    
     if combined_data:
-        final_df = pd.concat(combined_data, ignore_index=True)
-        output_path = f'data/processed/processed_v{version}.csv'
-        final_df.to_csv(output_path, index=False)
+        # Consumes combined_data, so peak memory stays near one copy of the output
+        final_df = stack_frames_consuming(combined_data)
+        output_path = f'data/processed/processed_v{version}.parquet'
+        final_df.to_parquet(output_path, compression='snappy', index=False)
         print(f"Saved combined data to {output_path}")
         print(f"Total records: {len(final_df)}")
         print(f"Features: {list(final_df.columns)}")
@@ -1,16 +1,27 @@
 import mlflow
 import mlflow.sklearn
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.model_selection import train_test_split, GridSearchCV
+from sklearn.ensemble import HistGradientBoostingClassifier
+from sklearn.inspection import permutation_importance
+from sklearn.model_selection import train_test_split
 from sklearn.metrics import accuracy_score, classification_report, confusion_matrix
 import pandas as pd
+import numpy as np
 import json
 import sys
 import os
 from datetime import datetime
 
+def ffill_zero(values):
+    """Forward fill NaNs down each column of a 2D array, leading NaNs become 0"""
+    valid = ~np.isnan(values)
+    last_valid = np.where(valid, np.arange(len(values))[:, None], 0)
+    np.maximum.accumulate(last_valid, axis=0, out=last_valid)
+    filled = values[last_valid, np.arange(values.shape[1])]
+    filled[np.isnan(filled)] = 0
+    return filled
+
 def train_model(data_path, version):
-    """Train model with hyperparameter tuning"""
+    """Train model and log it to MLflow"""
     
     # Set MLflow tracking URI
     mlflow.set_tracking_uri("file:./mlruns")
@@ -20,7 +31,8 @@ def train_model(data_path, version):
         print(f"Training model v{version} at {datetime.now()}")
         
         # Load data
-        df = pd.read_csv(data_path)
+        features = ['rolling_avg_10', 'volume_sum_10']
+        df = pd.read_parquet(data_path, columns=['timestamp'] + features + ['target'])
         print(f"Data shape: {df.shape}")
         print(f"Columns: {list(df.columns)}")
         
@@ -28,46 +40,42 @@ def train_model(data_path, version):
         target_dist = df['target'].value_counts()
         print(f"Target distribution: {target_dist.to_dict()}")
         
-        # Prepare features
-        features = ['rolling_avg_10', 'volume_sum_10']
-        X = df[features].fillna(method='ffill').fillna(0)
-        y = df['target']
+        # Prepare features as contiguous float32 arrays
+        # min_periods=1 rolling features are normally NaN-free, so only fill when needed
+        X = df[features].to_numpy(dtype=np.float32)
+        if np.isnan(X).any():
+            X = ffill_zero(X)
+        y = df['target'].to_numpy(dtype=np.int8)
         
         print(f"Feature shapes: {X.shape}")
-        print(f"Missing values: {X.isnull().sum().to_dict()}")
+        print(f"Missing values: {dict(zip(features, np.isnan(X).sum(axis=0).tolist()))}")
         
         # Time-based split (80% train, 20% test)
         # Sort by timestamp to maintain temporal order
-        df_sorted = df.sort_values('timestamp')
-        split_idx = int(len(df_sorted) * 0.8)
-        
-        train_indices = df_sorted.index[:split_idx]
-        test_indices = df_sorted.index[split_idx:]
+        order = df['timestamp'].argsort(kind='stable').to_numpy()
+        X = X[order]
+        y = y[order]
+        split_idx = int(len(order) * 0.8)
         
-        X_train = X.loc[train_indices]
-        X_test = X.loc[test_indices]
-        y_train = y.loc[train_indices]
-        y_test = y.loc[test_indices]
+        X_train, X_test = X[:split_idx], X[split_idx:]
+        y_train, y_test = y[:split_idx], y[split_idx:]
         
+        timestamps = df['timestamp']
         print(f"Train size: {len(X_train)}, Test size: {len(X_test)}")
-        print(f"Train period: {df_sorted.loc[train_indices, 'timestamp'].min()} to {df_sorted.loc[train_indices, 'timestamp'].max()}")
-        print(f"Test period: {df_sorted.loc[test_indices, 'timestamp'].min()} to {df_sorted.loc[test_indices, 'timestamp'].max()}")
-        
-        # Hyperparameter tuning
-        param_grid = {
-            'n_estimators': [50],
-            'max_depth': [10],
-            'min_samples_split': [2],
-            'min_samples_leaf': [1]
+        print(f"Train period: {timestamps.iloc[order[0]]} to {timestamps.iloc[order[split_idx - 1]]}")
+        print(f"Test period: {timestamps.iloc[order[split_idx]]} to {timestamps.iloc[order[-1]]}")
+        
+        # Fixed hyperparameters; histogram-based boosting bins the features once
+        # instead of sorting them at every split
+        # (early stopping off so max_iter is the number of iterations actually fitted)
+        params = {
+            'max_iter': 50,
+            'max_depth': 10,
+            'early_stopping': False
         }
         
-        
-        rf = RandomForestClassifier(random_state=42, class_weight='balanced')
-        grid_search = GridSearchCV(rf, param_grid, cv=3, scoring='accuracy', n_jobs=-1)
-        grid_search.fit(X_train, y_train)
-        
-        # Best model
-        best_model = grid_search.best_estimator_
+        best_model = HistGradientBoostingClassifier(random_state=42, class_weight='balanced', **params)
+        best_model.fit(X_train, y_train)
         
         # Predictions
         y_pred = best_model.predict(X_test)
@@ -77,15 +85,21 @@ def train_model(data_path, version):
         conf_matrix = confusion_matrix(y_test, y_pred)
         class_report = classification_report(y_test, y_pred, output_dict=True)
         
+        # Boosted models have no impurity importances; use permutation importance on the test set
+        importance = permutation_importance(best_model, X_test, y_test, n_repeats=5, random_state=42, n_jobs=-1)
+        feature_importance = dict(zip(features, importance.importances_mean.tolist()))
+        
         # Log parameters and metrics
-        mlflow.log_params(grid_search.best_params_)
-        mlflow.log_metric("accuracy", accuracy)
-        mlflow.log_metric("train_size", len(X_train))
-        mlflow.log_metric("test_size", len(X_test))
-        mlflow.log_metric("precision_0", class_report['0']['precision'])
-        mlflow.log_metric("recall_0", class_report['0']['recall'])
-        mlflow.log_metric("precision_1", class_report['1']['precision'])
-        mlflow.log_metric("recall_1", class_report['1']['recall'])
+        mlflow.log_params(params)
+        mlflow.log_metrics({
+            "accuracy": accuracy,
+            "train_size": len(X_train),
+            "test_size": len(X_test),
+            "precision_0": class_report['0']['precision'],
+            "recall_0": class_report['0']['recall'],
+            "precision_1": class_report['1']['precision'],
+            "recall_1": class_report['1']['recall']
+        })
         
         # Log model
         mlflow.sklearn.log_model(best_model, "model")
@@ -102,29 +116,26 @@ def train_model(data_path, version):
         metrics = {
             "version": version,
             "accuracy": float(accuracy),
-            "best_params": grid_search.best_params_,
+            "best_params": params,
             "train_size": int(len(X_train)),
             "test_size": int(len(X_test)),
             "confusion_matrix": conf_matrix.tolist(),
             "classification_report": class_report,
-            "feature_importance": {
-                features[i]: float(best_model.feature_importances_[i]) 
-                for i in range(len(features))
-            }
+            "feature_importance": feature_importance
         }
         
         with open(f'metrics_v{version}.json', 'w') as f:
             json.dump(metrics, f, indent=2)
         
         print(f"Model v{version} - Accuracy: {accuracy:.4f}")
-        print(f"Best parameters: {grid_search.best_params_}")
-        print(f"Feature importance: {dict(zip(features, best_model.feature_importances_))}")
+        print(f"Parameters: {params}")
+        print(f"Feature importance: {feature_importance}")
         
         return best_model, accuracy
 
 if __name__ == "__main__":
     version = sys.argv[1] if len(sys.argv) > 1 else "0"
-    data_path = f"data/processed/processed_v{version}.csv"
+    data_path = f"data/processed/processed_v{version}.parquet"
     
     if os.path.exists(data_path):
         train_model(data_path, version)
@@ -4,7 +4,7 @@ import numpy as np
 import sys
 import os
 sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
-from src.data_preprocessing import create_features, load_and_preprocess_data
+from src.data_preprocessing import combine_stock_data, create_features, load_and_preprocess_data, rolling_sum_count, stack_frames_consuming
 
 def test_rolling_average_feature():
     """Test rolling average calculation"""
@@ -48,7 +48,7 @@ def test_volume_sum_feature():
     
     # Test volume sum exists and is calculated correctly
     assert 'volume_sum_10' in df_with_features.columns
-    assert df_with_features['volume_sum_10'].dtype in ['int64', 'float64']
+    assert df_with_features['volume_sum_10'].dtype in ['int64', 'float64', 'float32']
     assert (df_with_features['volume_sum_10'] >= 0).all()
     
     # Test that volume sum is correct for 10th row
@@ -73,7 +73,7 @@ def test_target_creation():
     
     # Test target exists and is binary
     assert 'target' in df_with_features.columns
-    assert df_with_features['target'].dtype in ['int64', 'int32']
+    assert df_with_features['target'].dtype in ['int64', 'int32', 'int8']
     assert set(df_with_features['target'].unique()).issubset({0, 1})
     
     # Test target calculation (first row: 100 vs 98 at +5 = 0)
@@ -105,9 +105,174 @@ def test_data_sorting():
     # Test that timestamps are sorted
     assert df_with_features['timestamp'].is_monotonic_increasing
 
+def test_input_not_modified():
+    """Test that create_features leaves an already sorted input frame untouched"""
+    data = {
+        'timestamp': pd.date_range('2021-01-01 09:15', periods=20, freq='1T'),
+        'open': np.random.uniform(100, 110, 20),
+        'high': np.random.uniform(110, 120, 20),
+        'low': np.random.uniform(90, 100, 20),
+        'close': np.random.uniform(95, 115, 20),
+        'volume': np.random.randint(1000, 5000, 20)
+    }
+    df = pd.DataFrame(data)
+    original = df.copy()
+    
+    create_features(df)
+    
+    # Test no columns were added and no dtypes or values changed
+    pd.testing.assert_frame_equal(df, original)
+
+def test_index_reset():
+    """Test that output has a RangeIndex whether or not the input was sorted"""
+    timestamps = pd.date_range('2021-01-01 09:15', periods=20, freq='1T')
+    data = {
+        'timestamp': timestamps,
+        'open': np.random.uniform(100, 110, 20),
+        'high': np.random.uniform(110, 120, 20),
+        'low': np.random.uniform(90, 100, 20),
+        'close': np.random.uniform(95, 115, 20),
+        'volume': np.random.randint(1000, 5000, 20)
+    }
+    sorted_df = pd.DataFrame(data, index=range(100, 120))
+    unsorted_df = sorted_df.iloc[::-1]
+    
+    for df in [sorted_df, unsorted_df]:
+        df_with_features = create_features(df)
+        pd.testing.assert_index_equal(df_with_features.index, pd.RangeIndex(15))
+
+def test_rolling_sum_count():
+    """Test rolling sums and counts match pandas rolling with min_periods=1"""
+    values = np.array([np.nan, 1.0, 2.0, np.nan, np.nan, np.nan, 3.0, 4.0])
+    
+    sums, counts = rolling_sum_count(values, 3)
+    
+    # Counts only include non-NaN values in the trailing window
+    assert counts.tolist() == [0, 1, 2, 2, 1, 0, 1, 2]
+    expected = pd.Series(values).rolling(window=3, min_periods=1).sum()
+    has_values = counts > 0
+    np.testing.assert_allclose(sums[has_values], expected[has_values])
+    assert expected[~has_values].isna().all()
+
+def test_load_and_preprocess_data(tmp_path):
+    """Test trading-hours filtering, gap filling and timezone handling"""
+    rows = [
+        ('2021-01-04 09:15:00+05:30', 105.0),  # Monday (rows deliberately unsorted)
+        ('2021-01-01 09:14:00+05:30', 99.0),   # before market open
+        ('2021-01-01 09:15:00+05:30', 100.0),
+        ('2021-01-01 09:17:00+05:30', 101.0),  # 09:16 is missing
+        ('2021-01-01 15:30:00+05:30', 102.0),
+        ('2021-01-01 15:31:00+05:30', 103.0),  # after market close
+        ('2021-01-02 10:00:00+05:30', 104.0),  # Saturday
+    ]
+    df = pd.DataFrame(rows, columns=['timestamp', 'close'])
+    for col in ['open', 'high', 'low']:
+        df[col] = df['close']
+    df['volume'] = 1000
+    file_path = tmp_path / 'TEST__EQ__NSE__NSE__MINUTE.csv'
+    df.to_csv(file_path, index=False)
+    
+    result = load_and_preprocess_data(str(file_path))
+    ts = result['timestamp']
+    
+    # Exchange-local timezone is preserved and rows are in order
+    assert str(ts.dt.tz) == 'Asia/Kolkata'
+    assert ts.is_monotonic_increasing
+    
+    # Friday 09:15-15:30 (376 minutes) plus Monday 09:15; no weekend rows
+    assert len(result) == 377
+    assert (ts.dt.weekday < 5).all()
+    minute_of_day = ts.dt.hour * 60 + ts.dt.minute
+    assert minute_of_day.min() == 9 * 60 + 15
+    assert minute_of_day.max() == 15 * 60 + 30
+    
+    # Gaps are forward filled from the previous trading minute
+    close = result.set_index('timestamp')['close']
+    assert close[pd.Timestamp('2021-01-01 09:16', tz='Asia/Kolkata')] == 100.0
+    assert close[pd.Timestamp('2021-01-01 12:00', tz='Asia/Kolkata')] == 101.0
+    assert close[pd.Timestamp('2021-01-01 15:30', tz='Asia/Kolkata')] == 102.0
+    assert close[pd.Timestamp('2021-01-04 09:15', tz='Asia/Kolkata')] == 105.0
+    assert not result.isna().any().any()
+
+def test_load_and_preprocess_data_naive_timestamps(tmp_path):
+    """Test CSVs whose timestamps have no UTC offset are loaded as-is"""
+    df = pd.DataFrame({
+        'timestamp': ['2021-01-01 09:17:00', '2021-01-01 09:15:00', '2021-01-01 09:14:00'],
+        'open': [101.0, 100.0, 99.0],
+        'high': [101.0, 100.0, 99.0],
+        'low': [101.0, 100.0, 99.0],
+        'close': [101.0, 100.0, 99.0],
+        'volume': [1000, 1000, 1000]
+    })
+    file_path = tmp_path / 'TEST__EQ__NSE__NSE__MINUTE.csv'
+    df.to_csv(file_path, index=False)
+    
+    result = load_and_preprocess_data(str(file_path))
+    
+    # Timestamps stay naive and are treated as exchange time
+    assert result['timestamp'].dt.tz is None
+    assert result['timestamp'].tolist() == list(pd.date_range('2021-01-01 09:15', periods=3, freq='1T'))
+    assert result['close'].tolist() == [100.0, 100.0, 101.0]
+
+def test_combine_stock_data_missing_file(tmp_path, monkeypatch):
+    """Test that a missing input file does not become an empty stock category"""
+    monkeypatch.chdir(tmp_path)
+    (tmp_path / 'data' / 'processed').mkdir(parents=True)
+    df = pd.DataFrame({
+        'timestamp': pd.date_range('2021-01-01 09:15', periods=20, freq='1T').astype(str),
+        'open': np.random.uniform(100, 110, 20),
+        'high': np.random.uniform(110, 120, 20),
+        'low': np.random.uniform(90, 100, 20),
+        'close': np.random.uniform(95, 115, 20),
+        'volume': np.random.randint(1000, 5000, 20)
+    })
+    df.to_csv('AAA__EQ__NSE__NSE__MINUTE.csv', index=False)
+    
+    result = combine_stock_data(['AAA__EQ__NSE__NSE__MINUTE.csv', 'MISSING__EQ__NSE__NSE__MINUTE.csv'], 'test')
+    
+    assert list(result['stock'].cat.categories) == ['AAA']
+    assert len(result) == 15
+
+def make_stock_frame(stock_code, periods, tz='Asia/Kolkata'):
+    """Build a small per-stock frame in the shape process_stock returns"""
+    return pd.DataFrame({
+        'timestamp': pd.date_range('2021-01-04 09:15', periods=periods, freq='1T', tz=tz),
+        'close': np.arange(periods, dtype=np.float32),
+        'target': np.ones(periods, dtype=np.int8),
+        'stock': pd.Categorical.from_codes(np.full(periods, stock_code, dtype=np.int8), categories=['AAA', 'BBB'])
+    })
+
+def test_stack_frames():
+    """Test that stacking matches concat and keeps categorical and tz-aware dtypes"""
+    frames = [make_stock_frame(0, 3), make_stock_frame(1, 4)]
+    expected = pd.concat(frames, ignore_index=True)
+    
+    stacked = stack_frames_consuming(frames)
+    
+    pd.testing.assert_frame_equal(stacked, expected)
+    assert frames == []
+    assert str(stacked['timestamp'].dt.tz) == 'Asia/Kolkata'
+    assert stacked['timestamp'].iloc[0].hour == 9
+    assert list(stacked['stock']) == ['AAA'] * 3 + ['BBB'] * 4
+
+def test_stack_frames_schema_mismatch():
+    """Test that frames with different columns or dtypes are rejected"""
+    with pytest.raises(ValueError):
+        stack_frames_consuming([make_stock_frame(0, 3), make_stock_frame(1, 3, tz=None)])
+    
+    extra_column = make_stock_frame(1, 3)
+    extra_column['open'] = np.float32(1)
+    with pytest.raises(ValueError):
+        stack_frames_consuming([make_stock_frame(0, 3), extra_column])
+
 if __name__ == "__main__":
     test_rolling_average_feature()
     test_volume_sum_feature() 
     test_target_creation()
     test_data_sorting()
+    test_input_not_modified()
+    test_index_reset()
+    test_rolling_sum_count()
+    test_stack_frames()
+    test_stack_frames_schema_mismatch()
     print("All tests passed!")
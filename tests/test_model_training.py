@@ -0,0 +1,35 @@
+import pytest
+import pandas as pd
+import numpy as np
+import sys
+import os
+sys.path.append(os.path.join(os.path.dirname(__file__), '..'))
+from src.model_training import ffill_zero
+
+def test_ffill_zero():
+    """Test forward fill per column with leading NaNs replaced by 0"""
+    values = np.array([
+        [np.nan, 1.0],
+        [2.0, np.nan],
+        [np.nan, np.nan],
+        [3.0, 4.0],
+    ], dtype=np.float32)
+
+    filled = ffill_zero(values)
+
+    expected = np.array([
+        [0.0, 1.0],
+        [2.0, 1.0],
+        [2.0, 1.0],
+        [3.0, 4.0],
+    ], dtype=np.float32)
+    np.testing.assert_array_equal(filled, expected)
+    assert filled.dtype == np.float32
+
+    # Matches the pandas ffill + fillna(0) it replaces
+    pandas_filled = pd.DataFrame(values).ffill().fillna(0).to_numpy()
+    np.testing.assert_array_equal(filled, pandas_filled)
+
+if __name__ == "__main__":
+    test_ffill_zero()
+    print("All tests passed!")